@@ -4,10 +4,189 @@ SVGs and Image Support Added
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import re
 import math
-from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Optional faster JSON backend
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+
+# Any run of characters outside [a-z0-9] (dashes included) becomes one dash
+NON_SLUG_RUN_RE = re.compile(r'[^a-z0-9]+')
+
+CONTAINER_TYPES = frozenset({'FRAME', 'GROUP', 'COMPONENT', 'INSTANCE'})
+SHAPE_TYPES = frozenset({'RECTANGLE', 'ELLIPSE', 'VECTOR', 'LINE', 'POLYGON', 'STAR'})
+AUTO_LAYOUT_MODES = frozenset({'HORIZONTAL', 'VERTICAL'})
+
+# Node types whose fills are not rendered as a CSS background
+NO_BACKGROUND_TYPES = frozenset({'TEXT', 'VECTOR', 'LINE', 'ELLIPSE', 'POLYGON', 'STAR'})
+
+TYPE_CLASS_NAMES = {
+    'FRAME': 'frame',
+    'GROUP': 'group',
+    'TEXT': 'text',
+    'RECTANGLE': 'rectangle',
+    'ELLIPSE': 'ellipse',
+    'VECTOR': 'vector',
+    'COMPONENT': 'component',
+    'INSTANCE': 'instance'
+}
+
+TEXT_ALIGN_MAP = {'LEFT': 'left', 'CENTER': 'center', 'RIGHT': 'right', 'JUSTIFIED': 'justify'}
+
+FLEX_ALIGN_MAP = {
+    'MIN': 'flex-start',
+    'CENTER': 'center',
+    'MAX': 'flex-end',
+    'SPACE_BETWEEN': 'space-between'
+}
+
+# Layout properties are written first, in this order; the rest follow alphabetically
+CSS_PROP_ORDER = (
+    'position', 'display', 'flex-direction', 'flex', 'flex-grow',
+    'width', 'height', 'left', 'top', 'right', 'bottom',
+    'align-items', 'align-self', 'justify-content', 'order'
+)
+CSS_PROP_RANK = {prop: rank for rank, prop in enumerate(CSS_PROP_ORDER)}
+
+# Figma's /images render endpoint times out when asked for too many ids at once
+RENDER_BATCH_SIZE = 100
+
+# Concurrent downloads from Figma's image CDN
+MAX_DOWNLOAD_WORKERS = 8
+
+# Static rules written before and after the generated classes
+CSS_HEADER = """* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Inter', sans-serif;
+    background: #e5e5e5;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    min-height: 100vh;
+    padding: 20px;
+    zoom: 0.75; /* Scale down to 75% for better viewport fit */
+}
+"""
+
+CSS_FOOTER = """
+input {
+    outline: none;
+    font-family: inherit;
+    background: transparent;
+}
+
+input::placeholder {
+    color: #C0C0C0;
+}
+
+input:focus {
+    border-color: #95228C;
+}
+
+button {
+    cursor: pointer;
+    transition: transform 0.2s, opacity 0.2s;
+    border: none;
+    font-family: inherit;
+    font-size: inherit;
+}
+
+button:hover {
+    opacity: 0.9;
+}
+
+button:active {
+    transform: scale(0.98);
+}
+
+a {
+    text-decoration: none;
+}
+
+a:hover {
+    opacity: 0.8;
+}
+
+@media (max-width: 420px) {
+    body {
+        padding: 10px;
+        zoom: 1; /* Reset zoom on mobile */
+    }
+    [class*="frame"], [class*="container"] {
+        width: 100% !important;
+        max-width: 393px;
+        height: auto !important;
+        min-height: 852px;
+    }
+}
+"""
+
+# Indentation per tree depth
+INDENTS = tuple('  ' * depth for depth in range(128))
+
+# Escapes for Figma text in element content and attributes
+HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+# The empty div written for a shape node, replaced by inline SVG for vectors
+SHAPE_PLACEHOLDER_RE = re.compile(r'<div class="([^"]*)" data-node-id="([^"]*)"></div>')
+
+# Substrings that mark a text node as a link or an input as a search field
+LINK_KEYWORDS = ('forgot', 'learn', 'help', 'click', 'sign up',
+                 'log in', 'register', 'more info', 'read more',
+                 'terms', 'privacy', 'contact', 'here')
+SEARCH_KEYWORDS = ('search', 'find')
+
+# Link keywords as one compiled alternation
+LINK_KEYWORDS_RE = re.compile('|'.join(map(re.escape, LINK_KEYWORDS)))
+
+
+# Cached formatting helpers
+@lru_cache(maxsize=1024)
+def _px(value: float) -> str:
+    """Format a number as a CSS pixel length"""
+    int_value = int(value)
+    if int_value == value:
+        return f"{int_value}px"
+    return f"{value}px"
+
+
+@lru_cache(maxsize=2048)
+def _class_slug(name: str) -> str:
+    """Turn a layer name into a CSS-safe class name"""
+    slug = NON_SLUG_RUN_RE.sub('-', name.lower()).strip('-')
+    if not slug or slug[0].isdigit():
+        slug = f"node-{slug}"
+    return slug
+
+
+def _prop_sort_key(prop: str) -> Tuple[int, str]:
+    """Sort key putting CSS_PROP_ORDER properties first, the rest alphabetically"""
+    return CSS_PROP_RANK.get(prop, len(CSS_PROP_ORDER)), prop
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _format_rgba(r: float, g: float, b: float, a: float) -> str:
+    """Format 0-1 channels and an alpha as a CSS color"""
+    r, g, b = int(r * 255), int(g * 255), int(b * 255)
+    if a == 1:
+        return f"#{r:02X}{g:02X}{b:02X}"
+    return f"rgba({r}, {g}, {b}, {a})"
 
 
 class FigmaToHTMLConverter:
@@ -17,94 +196,131 @@ class FigmaToHTMLConverter:
         self.base_url = "https://api.figma.com/v1"
         self.headers = {"X-Figma-Token": figma_token}
         
+        # Keep-alive session for Figma API calls, with retry and backoff
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retries))
+        
+        # Separate tokenless session for CDN downloads
+        self.cdn_session = requests.Session()
+        self.cdn_session.mount("https://", HTTPAdapter(
+            pool_connections=4, pool_maxsize=MAX_DOWNLOAD_WORKERS, max_retries=retries))
+        
         self.fonts = set()
         self.used_class_names = set()
+        self._class_name_counters = {}  # Next suffix to try for each base class name
         self.images = {}  # Track image nodes and their URLs
         self.vectors = {}  # Store vector node info for SVG fetching
         
+        # Per-node caches keyed by id(node), storing (node, value)
+        self._visible_fills_cache = {}
+        self._visible_strokes_cache = {}
+        self._text_content_cache = {}
+        
     def fetch_file(self) -> Dict:
         """Fetch the Figma file JSON data"""
         url = f"{self.base_url}/files/{self.file_key}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return json_loads(response.content)
+    
+    def fetch_node(self, node_id: str) -> Dict:
+        """Fetch a single node and its subtree instead of the whole file"""
+        url = f"{self.base_url}/files/{self.file_key}/nodes"
+        response = self.session.get(url, params={'ids': node_id}, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return json_loads(response.content)
+    
+    def close(self):
+        """Close the pooled HTTP connections"""
+        self.session.close()
+        self.cdn_session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def fetch_images(self, node_ids: List[str]) -> Dict[str, str]:
         """Fetch image URLs from Figma API"""
         if not node_ids:
             return {}
         
-        ids_str = ','.join(node_ids)
-        url = f"{self.base_url}/images/{self.file_key}?ids={ids_str}&format=png&scale=2"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        result = response.json()
-        return result.get('images', {})
+        return self.fetch_render_urls(node_ids, "format=png&scale=2")
+    
+    def fetch_render_urls(self, node_ids: List[str], render_params: str) -> Dict[str, str]:
+        """Ask Figma to render nodes, RENDER_BATCH_SIZE ids per request"""
+        urls = {}
+        for start in range(0, len(node_ids), RENDER_BATCH_SIZE):
+            ids_str = ','.join(node_ids[start:start + RENDER_BATCH_SIZE])
+            url = f"{self.base_url}/images/{self.file_key}?ids={ids_str}&{render_params}"
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            result = json_loads(response.content)
+            urls.update(result.get('images', {}))
+        return urls
     
-    # New method to fetch SVGs
     def fetch_svg(self, node_id: str) -> Optional[str]:
-
         """Fetch SVG content from Figma API"""
-        url = f"{self.base_url}/images/{self.file_key}?ids={node_id}&format=svg"
+        return self.fetch_svgs([node_id]).get(node_id)
+    
+    def fetch_svgs(self, node_ids: List[str]) -> Dict[str, str]:
+        """Fetch SVG content for several nodes with one render request"""
+        return self.download_svgs(self.fetch_svg_urls(node_ids))
+    
+    def fetch_svg_urls(self, node_ids: List[str]) -> Dict[str, str]:
+        """Get CDN URLs of SVG renders from Figma API"""
+        if not node_ids:
+            return {}
+        
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            result = response.json()
-            
-            svg_url = result.get('images', {}).get(node_id)
-            if svg_url:
-                svg_response = requests.get(svg_url)
-                svg_response.raise_for_status()
-                return svg_response.text
+            return self.fetch_render_urls(node_ids, "format=svg")
         except Exception as e:
-            print(f"Failed to fetch SVG for {node_id}: {e}")
-        
-        return None
-        # """Fetch multiple SVG URLs for given vector node IDs"""
-        # if not node_ids:
-        #     return {}
-
-        # # Convert dict keys (node IDs) to comma-separated string
-        # ids_str = ','.join(node_ids.keys())
-        # url = f"{self.base_url}/images/{self.file_key}?ids={ids_str}&format=svg"
-
-        # try:
-        #     response = requests.get(url, headers=self.headers)
-        #     response.raise_for_status()
-        #     result = response.json()
-        #     return result.get('images', {})  # Mapping {node_id: svg_url}
-        # except Exception as e:
-        #     print(f"Failed to fetch SVG URLs: {e}")
-        #     return {}
-        
+            print(f"Failed to fetch SVG URLs for {len(node_ids)} nodes: {e}")
+            return {}
+    
+    def download_svgs(self, svg_urls: Dict[str, str]) -> Dict[str, str]:
+        """Download SVG content from the CDN, several files at a time"""
+        def download(item: Tuple[str, str]) -> Tuple[str, Optional[str]]:
+            node_id, svg_url = item
+            try:
+                svg_response = self.cdn_session.get(svg_url, timeout=30)
+                svg_response.raise_for_status()
+                return node_id, svg_response.text
+            except Exception as e:
+                print(f"Failed to fetch SVG for {node_id}: {e}")
+                return node_id, None
+        
+        # The CDN downloads are independent, so run them side by side
+        pending = [(node_id, svg_url) for node_id, svg_url in svg_urls.items() if svg_url]
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+            return {node_id: svg for node_id, svg in executor.map(download, pending) if svg}
+    
     def rgba_to_css(self, color: Dict, opacity: float = None) -> str:
         """Convert Figma RGBA to CSS color"""
         if not color:
             return "transparent"
         
-        r = int(color.get('r', 0) * 255)
-        g = int(color.get('g', 0) * 255)
-        b = int(color.get('b', 0) * 255)
-        
         if opacity is not None:
             a = opacity
         else:
             a = color.get('a', 1)
         
-        if a == 1:
-            return f"#{r:02X}{g:02X}{b:02X}"
-        return f"rgba({r}, {g}, {b}, {a})"
+        return _format_rgba(color.get('r', 0), color.get('g', 0), color.get('b', 0), a)
     
     def extract_gradient_css(self, fill: Dict) -> Optional[str]:
         """Extract gradient CSS with exact angle calculation"""
         if fill.get('type') != 'GRADIENT_LINEAR':
             return None
         
-        stops = fill.get('gradientStops', [])
+        stops = fill.get('gradientStops', ())
         if not stops:
             return None
         
-        handles = fill.get('gradientHandlePositions', [])
+        handles = fill.get('gradientHandlePositions', ())
         if len(handles) >= 2:
             x1, y1 = handles[0]['x'], handles[0]['y']
             x2, y2 = handles[1]['x'], handles[1]['y']
@@ -112,35 +328,38 @@ class FigmaToHTMLConverter:
             dx = x2 - x1
             dy = y2 - y1
             
-            angle_rad = math.atan2(dy, dx)
-            angle_deg = math.degrees(angle_rad)
-            css_angle = (90 - angle_deg) % 360
+            # Axis-aligned handles skip atan2 (copysign matches it for signed zeros)
+            if dy == 0:
+                css_angle = 90 if math.copysign(1, dx) > 0 else 270
+            elif dx == 0:
+                css_angle = 0 if dy > 0 else 180
+            else:
+                angle_deg = math.degrees(math.atan2(dy, dx))
+                css_angle = (90 - angle_deg) % 360
         else:
             css_angle = 180
         
-        gradient_stops = []
-        for stop in stops:
-            color = self.rgba_to_css(stop['color'])
-            pos = stop.get('position', 0) * 100
-            gradient_stops.append(f"{color} {pos:.2f}%")
+        rgba_to_css = self.rgba_to_css
+        gradient_stops = ', '.join([
+            f"{rgba_to_css(stop['color'])} {stop.get('position', 0) * 100:.2f}%"
+            for stop in stops
+        ])
         
-        return f"linear-gradient({css_angle:.2f}deg, {', '.join(gradient_stops)})"
+        return f"linear-gradient({css_angle:.2f}deg, {gradient_stops})"
     
     def get_unique_class_name(self, base_name: str) -> str:
         """Generate unique class name"""
-        clean = re.sub(r'[^a-z0-9-]', '-', base_name.lower())
-        clean = re.sub(r'-+', '-', clean).strip('-')
-        
-        if not clean or clean[0].isdigit():
-            clean = f"node-{clean}"
+        clean = _class_slug(base_name)
         
         if clean not in self.used_class_names:
             self.used_class_names.add(clean)
             return clean
         
-        counter = 2
+        # Resume from the last suffix handed out for this base
+        counter = self._class_name_counters.get(clean, 2)
         while f"{clean}-{counter}" in self.used_class_names:
             counter += 1
+        self._class_name_counters[clean] = counter + 1
         
         final_name = f"{clean}-{counter}"
         self.used_class_names.add(final_name)
@@ -154,111 +373,151 @@ class FigmaToHTMLConverter:
         if name:
             return self.get_unique_class_name(name)
         
-        type_map = {
-            'FRAME': 'frame',
-            'GROUP': 'group',
-            'TEXT': 'text',
-            'RECTANGLE': 'rectangle',
-            'ELLIPSE': 'ellipse',
-            'VECTOR': 'vector',
-            'COMPONENT': 'component',
-            'INSTANCE': 'instance'
-        }
-        
-        base = type_map.get(node_type, 'element')
+        base = TYPE_CLASS_NAMES.get(node_type, 'element')
         return self.get_unique_class_name(base)
     
     def get_text_content(self, node: Dict) -> str:
-        """Get text content from node or its children"""
+        """Get text content from node or its children, cached per node"""
         if node.get('type') == 'TEXT':
             return node.get('characters', '')
         
-        for child in node.get('children', []):
-            text = self.get_text_content(child)
+        # Every enclosing frame asks for its text, so cache each subtree's result
+        cache = self._text_content_cache
+        cached = cache.get(id(node))
+        if cached is not None and cached[0] is node:
+            return cached[1]
+        
+        # Depth-first walk; the first text found is cached for every container on the path
+        path = [(node, iter(node.get('children', ())))]
+        text = ''
+        while path:
+            container, children = path[-1]
+            child = next(children, None)
+            if child is None:
+                cache[id(container)] = (container, '')
+                path.pop()
+                continue
+            
+            if child.get('type') == 'TEXT':
+                text = child.get('characters', '')
+            else:
+                cached = cache.get(id(child))
+                if cached is None or cached[0] is not child:
+                    path.append((child, iter(child.get('children', ()))))
+                    continue
+                text = cached[1]
+            
             if text:
-                return text
+                break
         
-        return ''
+        for container, _ in path:
+            cache[id(container)] = (container, text)
+        return text
     
     def get_text_styles_from_children(self, node: Dict) -> Optional[Dict[str, str]]:
         """Get text styles from first text child"""
-        for child in node.get('children', []):
+        # Pre-order walk; children are pushed in reverse to be visited in order
+        stack = list(reversed(node.get('children', ())))
+        while stack:
+            child = stack.pop()
             if child.get('type') == 'TEXT':
                 return self.extract_text_styles(child)
-            result = self.get_text_styles_from_children(child)
-            if result:
-                return result
+            stack.extend(reversed(child.get('children', ())))
         return None
     
+    def get_visible_fills(self, node: Dict) -> List[Dict]:
+        """Get visible fills (or legacy background paints), cached per node"""
+        cached = self._visible_fills_cache.get(id(node))
+        if cached is not None and cached[0] is node:
+            return cached[1]
+        
+        fills = node.get('fills', ()) or node.get('background', ())
+        visible_fills = [f for f in fills if f.get('visible', True)]
+        self._visible_fills_cache[id(node)] = (node, visible_fills)
+        return visible_fills
+    
+    def get_visible_strokes(self, node: Dict) -> List[Dict]:
+        """Get visible strokes, cached per node"""
+        cached = self._visible_strokes_cache.get(id(node))
+        if cached is not None and cached[0] is node:
+            return cached[1]
+        
+        visible_strokes = [s for s in node.get('strokes', ()) if s.get('visible', True)]
+        self._visible_strokes_cache[id(node)] = (node, visible_strokes)
+        return visible_strokes
+    
     def is_likely_input(self, node: Dict) -> bool:
         """Detect if node should be an input field"""
         if node.get('type') != 'FRAME':
             return False
         
-        strokes = node.get('strokes', [])
-        if not strokes or not any(s.get('visible', True) for s in strokes):
+        if not self.get_visible_strokes(node):
             return False
         
         if not node.get('layoutMode'):
             return False
         
-        text = self.get_text_content(node)
-        if not text:
+        bounds = node.get('absoluteBoundingBox', {})
+        if not (bounds.get('height', 999) <= 100 and bounds.get('width', 0) > 80):
             return False
         
-        fills = node.get('fills', []) or node.get('background', [])
-        visible_fills = [f for f in fills if f.get('visible', True)]
+        visible_fills = self.get_visible_fills(node)
         if any(f.get('type') == 'GRADIENT_LINEAR' for f in visible_fills):
             return False
         
         if visible_fills:
-            solid_fills = [f for f in visible_fills if f.get('type') == 'SOLID']
-            if solid_fills:
-                color = solid_fills[0].get('color', {})
+            solid_fill = next((f for f in visible_fills if f.get('type') == 'SOLID'), None)
+            if solid_fill:
+                color = solid_fill.get('color', {})
                 r, g, b = color.get('r', 1), color.get('g', 1), color.get('b', 1)
                 is_colored = not (r > 0.85 and g > 0.85 and b > 0.85)
                 radius = node.get('cornerRadius', 0)
                 if is_colored and radius > 20:
                     return False
         
-        bounds = node.get('absoluteBoundingBox', {})
-        height = bounds.get('height', 999)
-        width = bounds.get('width', 0)
-        
-        return height <= 100 and width > 80
+        # The subtree text walk is the expensive part, so it goes last
+        return bool(self.get_text_content(node))
     
     def is_likely_button(self, node: Dict) -> bool:
         """Detect if node should be a button"""
         if node.get('type') != 'FRAME':
             return False
         
-        fills = node.get('fills', []) or node.get('background', [])
-        visible_fills = [f for f in fills if f.get('visible', True)]
-        
-        has_gradient = any(f.get('type') == 'GRADIENT_LINEAR' for f in visible_fills)
-        
-        has_colored_bg = False
-        if not has_gradient and visible_fills:
-            solid_fills = [f for f in visible_fills if f.get('type') == 'SOLID']
-            if solid_fills:
-                color = solid_fills[0].get('color', {})
-                r, g, b = color.get('r', 1), color.get('g', 1), color.get('b', 1)
-                has_colored_bg = not (r > 0.85 and g > 0.85 and b > 0.85)
+        bounds = node.get('absoluteBoundingBox', {})
+        if not (20 <= bounds.get('height', 0) <= 100 and bounds.get('width', 0) > 80):
+            return False
         
-        radius = node.get('cornerRadius', 0)
+        visible_fills = self.get_visible_fills(node)
         
-        text = self.get_text_content(node)
-        if not text:
-            return False
+        has_gradient = any(f.get('type') == 'GRADIENT_LINEAR' for f in visible_fills)
         
-        bounds = node.get('absoluteBoundingBox', {})
-        height = bounds.get('height', 0)
-        width = bounds.get('width', 0)
+        if not has_gradient:
+            if node.get('cornerRadius', 0) < 15:
+                return False
+            
+            solid_fill = next((f for f in visible_fills if f.get('type') == 'SOLID'), None)
+            if not solid_fill:
+                return False
+            
+            color = solid_fill.get('color', {})
+            r, g, b = color.get('r', 1), color.get('g', 1), color.get('b', 1)
+            if r > 0.85 and g > 0.85 and b > 0.85:
+                return False
         
-        is_button_size = 20 <= height <= 100 and width > 80
-        is_button_style = has_gradient or (has_colored_bg and radius >= 15)
+        return bool(self.get_text_content(node))
+    
+    def classify_container(self, node: Dict) -> Tuple[str, str]:
+        """Classify a container as 'input', 'button' or 'div', with its text"""
+        if node.get('type') != 'FRAME':
+            return 'div', ''
         
-        return is_button_size and is_button_style
+        if self.is_likely_input(node):
+            kind = 'input'
+        elif self.is_likely_button(node):
+            kind = 'button'
+        else:
+            return 'div', ''
+        return kind, self.get_text_content(node)
     
     def is_likely_link(self, node: Dict) -> bool:
         """Detect if text node should be a link"""
@@ -267,11 +526,7 @@ class FigmaToHTMLConverter:
         
         text = node.get('characters', '').lower()
         
-        link_keywords = ['forgot', 'learn', 'help', 'click', 'sign up', 
-                        'log in', 'register', 'more info', 'read more',
-                        'terms', 'privacy', 'contact', 'here']
-        
-        return any(keyword in text for keyword in link_keywords)
+        return LINK_KEYWORDS_RE.search(text) is not None
     
     def should_skip_node(self, node: Dict, parent: Dict = None) -> bool:
         """Check if node should be skipped"""
@@ -279,7 +534,7 @@ class FigmaToHTMLConverter:
             return False
         
         if parent:
-            if self.is_likely_button(parent) or self.is_likely_input(parent):
+            if self.classify_container(parent)[0] != 'div':
                 return True
         
         return False
@@ -293,12 +548,13 @@ class FigmaToHTMLConverter:
         self.fonts.add(font_family)
         css['font-family'] = f"'{font_family}'"
         css['font-style'] = 'normal'
+        font_size = style.get('fontSize', 16)
         css['font-weight'] = str(style.get('fontWeight', 400))
-        css['font-size'] = f"{style.get('fontSize', 16)}px"
+        css['font-size'] = _px(font_size)
         
         line_height_unit = style.get('lineHeightUnit', 'AUTO')
         if line_height_unit == 'PIXELS':
-            css['line-height'] = f"{style.get('lineHeightPx')}px"
+            css['line-height'] = _px(style.get('lineHeightPx'))
         elif line_height_unit == 'FONT_SIZE_%':
             percent = style.get('lineHeightPercentFontSize', 100)
             css['line-height'] = f"{int(percent)}%"
@@ -307,21 +563,19 @@ class FigmaToHTMLConverter:
             css['line-height'] = f"{percent:.1f}%"
         
         text_align = style.get('textAlignHorizontal', 'LEFT')
-        align_map = {'LEFT': 'left', 'CENTER': 'center', 'RIGHT': 'right', 'JUSTIFIED': 'justify'}
-        css['text-align'] = align_map.get(text_align, 'left')
+        css['text-align'] = TEXT_ALIGN_MAP.get(text_align, 'left')
         
         if 'letterSpacing' in style:
             spacing = style['letterSpacing']
             if abs(spacing) < 1:
-                css['letter-spacing'] = f"{spacing / style.get('fontSize', 16):.2f}em"
+                css['letter-spacing'] = f"{spacing / font_size:.2f}em"
             else:
-                css['letter-spacing'] = f"{spacing}px"
+                css['letter-spacing'] = _px(spacing)
         
-        fills = node.get('fills', [])
+        fills = node.get('fills', ())
         if fills:
-            visible_fills = [f for f in fills if f.get('visible', True)]
-            if visible_fills:
-                fill = visible_fills[0]
+            fill = next((f for f in fills if f.get('visible', True)), None)
+            if fill:
                 fill_opacity = fill.get('opacity', 1)
                 color = fill.get('color', {})
                 css['color'] = self.rgba_to_css(color, fill_opacity)
@@ -331,26 +585,29 @@ class FigmaToHTMLConverter:
     def extract_styles(self, node: Dict, parent: Dict = None) -> Dict[str, str]:
         """Extract CSS styles from any Figma node"""
         css = {}
-        node_type = node.get('type')
-        bounds = node.get('absoluteBoundingBox', {})
+        get = node.get
+        node_type = get('type')
+        bounds = get('absoluteBoundingBox', {})
+        width = bounds.get('width')
+        height = bounds.get('height')
         
         # POSITIONING
         parent_layout = parent.get('layoutMode') if parent else None
         
-        if parent_layout in ['HORIZONTAL', 'VERTICAL']:
-            layout_sizing_h = node.get('layoutSizingHorizontal', 'FIXED')
-            layout_sizing_v = node.get('layoutSizingVertical', 'FIXED')
+        if parent_layout in AUTO_LAYOUT_MODES:
+            layout_sizing_h = get('layoutSizingHorizontal', 'FIXED')
+            layout_sizing_v = get('layoutSizingVertical', 'FIXED')
             
             if layout_sizing_h == 'FILL':
                 css['align-self'] = 'stretch'
             elif layout_sizing_h == 'HUG':
                 css['width'] = 'fit-content'
-            elif bounds.get('width'):
-                css['width'] = f"{bounds['width']}px"
+            elif width:
+                css['width'] = _px(width)
             
             if layout_sizing_v == 'FIXED':
-                if bounds.get('height'):
-                    css['height'] = f"{bounds['height']}px"
+                if height:
+                    css['height'] = _px(height)
             elif layout_sizing_v == 'HUG':
                 css['height'] = 'fit-content'
             elif layout_sizing_v == 'FILL':
@@ -365,54 +622,43 @@ class FigmaToHTMLConverter:
                 parent_bounds = parent.get('absoluteBoundingBox', {})
                 x = bounds.get('x', 0) - parent_bounds.get('x', 0)
                 y = bounds.get('y', 0) - parent_bounds.get('y', 0)
-                css['left'] = f"{x}px"
-                css['top'] = f"{y}px"
+                css['left'] = _px(x)
+                css['top'] = _px(y)
             
-            if bounds.get('width'):
-                css['width'] = f"{bounds['width']}px"
-            if bounds.get('height'):
-                css['height'] = f"{bounds['height']}px"
+            if width:
+                css['width'] = _px(width)
+            if height:
+                css['height'] = _px(height)
         
         # AUTO-LAYOUT
-        layout_mode = node.get('layoutMode')
-        if layout_mode in ['HORIZONTAL', 'VERTICAL']:
+        layout_mode = get('layoutMode')
+        if layout_mode in AUTO_LAYOUT_MODES:
             css['display'] = 'flex'
             css['flex-direction'] = 'row' if layout_mode == 'HORIZONTAL' else 'column'
             
-            counter_align = node.get('counterAxisAlignItems', 'MIN')
-            primary_align = node.get('primaryAxisAlignItems', 'MIN')
-            
-            align_map = {
-                'MIN': 'flex-start',
-                'CENTER': 'center',
-                'MAX': 'flex-end',
-                'SPACE_BETWEEN': 'space-between'
-            }
+            counter_align = get('counterAxisAlignItems', 'MIN')
+            primary_align = get('primaryAxisAlignItems', 'MIN')
             
-            css['align-items'] = align_map.get(counter_align, 'flex-start')
-            css['justify-content'] = align_map.get(primary_align, 'flex-start')
+            css['align-items'] = FLEX_ALIGN_MAP.get(counter_align, 'flex-start')
+            css['justify-content'] = FLEX_ALIGN_MAP.get(primary_align, 'flex-start')
             
-            pt = node.get('paddingTop', 0)
-            pr = node.get('paddingRight', 0)
-            pb = node.get('paddingBottom', 0)
-            pl = node.get('paddingLeft', 0)
+            pt, pr, pb, pl = get('paddingTop', 0), get('paddingRight', 0), get('paddingBottom', 0), get('paddingLeft', 0)
             
-            if any([pt, pr, pb, pl]):
+            if pt or pr or pb or pl:
                 if pt == pr == pb == pl:
-                    css['padding'] = f"{pt}px"
+                    css['padding'] = _px(pt)
                 elif pt == pb and pl == pr:
-                    css['padding'] = f"{pt}px {pr}px"
+                    css['padding'] = f"{_px(pt)} {_px(pr)}"
                 else:
-                    css['padding'] = f"{pt}px {pr}px {pb}px {pl}px"
+                    css['padding'] = f"{_px(pt)} {_px(pr)} {_px(pb)} {_px(pl)}"
             
-            gap = node.get('itemSpacing', 0)
+            gap = get('itemSpacing', 0)
             if gap > 0:
-                css['gap'] = f"{gap}px"
+                css['gap'] = _px(gap)
         
         # BACKGROUND
-        if node_type not in ['TEXT', 'VECTOR', 'LINE', 'ELLIPSE', 'POLYGON', 'STAR']:
-            fills = node.get('fills', []) or node.get('background', [])
-            visible_fills = [f for f in fills if f.get('visible', True)]
+        if node_type not in NO_BACKGROUND_TYPES:
+            visible_fills = self.get_visible_fills(node)
             
             if visible_fills:
                 fill = visible_fills[0]
@@ -426,37 +672,36 @@ class FigmaToHTMLConverter:
                     # Track image for fetching
                     image_ref = fill.get('imageRef')
                     if image_ref:
-                        node_id = node.get('id')
+                        node_id = get('id')
                         self.images[node_id] = image_ref
                         css['background-image'] = f"url('{image_ref}.png')"
                         css['background-size'] = 'cover'
                         css['background-position'] = 'center'
         
         # BORDER
-        strokes = node.get('strokes', [])
-        visible_strokes = [s for s in strokes if s.get('visible', True)]
+        visible_strokes = self.get_visible_strokes(node)
         
         if visible_strokes:
-            stroke_weight = node.get('strokeWeight', 0)
+            stroke_weight = get('strokeWeight', 0)
             if stroke_weight > 0:
                 stroke_color = self.rgba_to_css(visible_strokes[0].get('color', {}))
-                css['border'] = f"{stroke_weight}px solid {stroke_color}"
+                css['border'] = f"{_px(stroke_weight)} solid {stroke_color}"
         
         # BORDER RADIUS
-        corners = node.get('rectangleCornerRadii')
+        corners = get('rectangleCornerRadii')
         
         if corners and len(corners) == 4:
             tl, tr, br, bl = corners
             
             if tl == tr == br == bl:
                 if tl > 0:
-                    css['border-radius'] = f"{tl}px"
+                    css['border-radius'] = _px(tl)
             else:
-                css['border-radius'] = f"{tl}px {tr}px {br}px {bl}px"
+                css['border-radius'] = f"{_px(tl)} {_px(tr)} {_px(br)} {_px(bl)}"
         else:
-            radius = node.get('cornerRadius', 0)
+            radius = get('cornerRadius', 0)
             if radius > 0:
-                css['border-radius'] = f"{radius}px"
+                css['border-radius'] = _px(radius)
         
         # TEXT STYLES
         if node_type == 'TEXT':
@@ -470,12 +715,13 @@ class FigmaToHTMLConverter:
                 css['justify-content'] = 'center'
         
         # EFFECTS
-        effects = node.get('effects', [])
+        effects = get('effects', ())
         visible_effects = [e for e in effects if e.get('visible', True)]
         
         shadows = []
         for effect in visible_effects:
-            if effect.get('type') == 'DROP_SHADOW':
+            effect_type = effect.get('type')
+            if effect_type == 'DROP_SHADOW':
                 color = self.rgba_to_css(effect.get('color', {}))
                 offset = effect.get('offset', {})
                 blur = effect.get('radius', 0)
@@ -484,30 +730,30 @@ class FigmaToHTMLConverter:
                 y = offset.get('y', 0)
                 
                 if spread > 0:
-                    shadows.append(f"{x}px {y}px {blur}px {spread}px {color}")
+                    shadows.append(f"{_px(x)} {_px(y)} {_px(blur)} {_px(spread)} {color}")
                 else:
-                    shadows.append(f"{x}px {y}px {blur}px {color}")
-            elif effect.get('type') == 'INNER_SHADOW':
+                    shadows.append(f"{_px(x)} {_px(y)} {_px(blur)} {color}")
+            elif effect_type == 'INNER_SHADOW':
                 color = self.rgba_to_css(effect.get('color', {}))
                 offset = effect.get('offset', {})
                 blur = effect.get('radius', 0)
                 x = offset.get('x', 0)
                 y = offset.get('y', 0)
-                shadows.append(f"inset {x}px {y}px {blur}px {color}")
-            elif effect.get('type') == 'BACKGROUND_BLUR':
+                shadows.append(f"inset {_px(x)} {_px(y)} {_px(blur)} {color}")
+            elif effect_type == 'BACKGROUND_BLUR':
                 radius = effect.get('radius', 10)
-                css['backdrop-filter'] = f"blur({radius}px)"
+                css['backdrop-filter'] = f"blur({_px(radius)})"
         
         if shadows:
             css['box-shadow'] = ', '.join(shadows)
         
         # OPACITY
-        opacity = node.get('opacity', 1)
+        opacity = get('opacity', 1)
         if opacity < 1:
             css['opacity'] = str(opacity)
         
         # OVERFLOW
-        if node.get('clipsContent', False):
+        if get('clipsContent', False):
             css['overflow'] = 'hidden'
         
         # Root frame
@@ -518,191 +764,129 @@ class FigmaToHTMLConverter:
         return css
     
     def generate_html(self, node: Dict, parent: Dict = None, depth: int = 0) -> Tuple[str, Dict]:
-        """Generate HTML and CSS for any node"""
-        if not node.get('visible', True):
+        """Generate HTML and CSS for a node and its subtree"""
+        if not node.get('visible', True) or self.should_skip_node(node, parent):
             return '', {}
         
-        if self.should_skip_node(node, parent):
-            return '', {}
+        all_css = {}
         
-        node_type = node.get('type')
-        class_name = self.get_semantic_class(node)
+        # Every element's HTML goes into one flat list, joined once at the end
+        out: List[str] = []
         
-        css = self.extract_styles(node, parent)
-        all_css = {class_name: css} if css else {}
+        # Iterative walk; containers are re-pushed as (class name, open tag index) exit markers
+        stack = [(node, parent, depth, None)]
         
-        html = ''
-        indent = '  ' * depth
-        
-        # TEXT NODES
-        if node_type == 'TEXT':
-            text = node.get('characters', '')
+        while stack:
+            node, parent, depth, exit_marker = stack.pop()
+            indent = INDENTS[depth] if depth < len(INDENTS) else '  ' * depth
             
-            if self.is_likely_link(node):
-                html = f'{indent}<a href="#" class="{class_name}">{text}</a>'
-            else:
-                style = node.get('style', {})
-                font_size = style.get('fontSize', 16)
-                font_weight = style.get('fontWeight', 400)
-                
-                if font_size >= 48 or (font_size >= 36 and font_weight >= 700):
-                    tag = 'h1'
-                elif font_size >= 32 or (font_size >= 24 and font_weight >= 700):
-                    tag = 'h2'
-                elif font_size >= 24:
-                    tag = 'h3'
+            if exit_marker is not None:
+                class_name, open_index = exit_marker
+                if len(out) == open_index + 1:
+                    out[open_index] = f'{indent}<div class="{class_name}"></div>'
                 else:
-                    tag = 'p'
-                
-                html = f'{indent}<{tag} class="{class_name}">{text}</{tag}>'
-        
-        # CONTAINER NODES
-        elif node_type in ['FRAME', 'GROUP', 'COMPONENT', 'INSTANCE']:
-            if self.is_likely_input(node):
-                text = self.get_text_content(node)
-                text_lower = text.lower()
+                    out.append(f'{indent}</div>')
+                continue
+            
+            node_type = node.get('type')
+            class_name = self.get_semantic_class(node)
+            
+            css = self.extract_styles(node, parent)
+            if css:
+                all_css[class_name] = css
+            
+            html = ''
+            
+            # TEXT NODES
+            if node_type == 'TEXT':
+                safe_text = node.get('characters', '').translate(HTML_ESCAPE_TABLE)
                 
-                if 'password' in text_lower:
-                    html = f'{indent}<input type="password" class="{class_name}" placeholder="{text}">'
-                elif '@' in text and '.' in text:
-                    html = f'{indent}<input type="email" class="{class_name}" value="{text}">'
-                elif any(word in text_lower for word in ['search', 'find']):
-                    html = f'{indent}<input type="search" class="{class_name}" placeholder="{text}">'
+                if self.is_likely_link(node):
+                    html = f'{indent}<a href="#" class="{class_name}">{safe_text}</a>'
                 else:
-                    html = f'{indent}<input type="text" class="{class_name}" placeholder="{text}">'
+                    style = node.get('style', {})
+                    font_size = style.get('fontSize', 16)
+                    font_weight = style.get('fontWeight', 400)
+                    
+                    if font_size >= 48 or (font_size >= 36 and font_weight >= 700):
+                        tag = 'h1'
+                    elif font_size >= 32 or (font_size >= 24 and font_weight >= 700):
+                        tag = 'h2'
+                    elif font_size >= 24:
+                        tag = 'h3'
+                    else:
+                        tag = 'p'
+                    
+                    html = f'{indent}<{tag} class="{class_name}">{safe_text}</{tag}>'
             
-            elif self.is_likely_button(node):
-                text = self.get_text_content(node)
-                
-                text_styles = self.get_text_styles_from_children(node)
-                if text_styles and 'color' in text_styles:
-                    all_css[class_name]['color'] = text_styles['color']
+            # CONTAINER NODES
+            elif node_type in CONTAINER_TYPES:
+                kind, text = self.classify_container(node)
+                safe_text = text.translate(HTML_ESCAPE_TABLE)
                 
-                html = f'{indent}<button class="{class_name}">{text}</button>'
-            
-            else:
-                children = node.get('children', [])
-                children_html = []
+                if kind == 'input':
+                    text_lower = text.lower()
+                    
+                    if 'password' in text_lower:
+                        html = f'{indent}<input type="password" class="{class_name}" placeholder="{safe_text}">'
+                    elif '@' in text and '.' in text:
+                        html = f'{indent}<input type="email" class="{class_name}" value="{safe_text}">'
+                    elif any(word in text_lower for word in SEARCH_KEYWORDS):
+                        html = f'{indent}<input type="search" class="{class_name}" placeholder="{safe_text}">'
+                    else:
+                        html = f'{indent}<input type="text" class="{class_name}" placeholder="{safe_text}">'
                 
-                for child in children:
-                    child['parent'] = node
-                    child_html, child_css = self.generate_html(child, node, depth + 1)
-                    if child_html:
-                        children_html.append(child_html)
-                    all_css.update(child_css)
+                elif kind == 'button':
+                    text_styles = self.get_text_styles_from_children(node)
+                    if text_styles and 'color' in text_styles:
+                        all_css[class_name]['color'] = text_styles['color']
+                    
+                    html = f'{indent}<button class="{class_name}">{safe_text}</button>'
                 
-                if children_html:
-                    children_str = '\n'.join(children_html)
-                    html = f'{indent}<div class="{class_name}">\n{children_str}\n{indent}</div>'
                 else:
-                    html = f'{indent}<div class="{class_name}"></div>'
-        
-        # SHAPE NODES
-        elif node_type in ['RECTANGLE', 'ELLIPSE', 'VECTOR', 'LINE', 'POLYGON', 'STAR']:
-            # Track vectors for SVG export
-            if node_type == 'VECTOR':
-                self.vectors[node.get('id')] = class_name
+                    # Push visible children in reverse to pop them in document order
+                    stack.append((node, parent, depth, (class_name, len(out))))
+                    out.append(f'{indent}<div class="{class_name}">')
+                    for child in reversed(node.get('children', ())):
+                        if child.get('visible', True):
+                            stack.append((child, node, depth + 1, None))
+                    continue
+            
+            # SHAPE NODES
+            elif node_type in SHAPE_TYPES:
+                # Track vectors for SVG export
+                if node_type == 'VECTOR':
+                    self.vectors[node.get('id')] = class_name
+                
+                html = f'{indent}<div class="{class_name}" data-node-id="{node.get("id")}"></div>'
             
-            html = f'{indent}<div class="{class_name}" data-node-id="{node.get("id")}"></div>'
+            if html:
+                out.append(html)
         
-        return html, all_css
+        return '\n'.join(out), all_css
     
     def css_to_string(self, css_dict: Dict[str, Dict[str, str]]) -> str:
         """Convert CSS dictionary to formatted string"""
         lines = []
         
-        lines.append("""* {
-    margin: 0;
-    padding: 0;
-    box-sizing: border-box;
-}
-
-body {
-    font-family: 'Inter', sans-serif;
-    background: #e5e5e5;
-    display: flex;
-    justify-content: center;
-    align-items: center;
-    min-height: 100vh;
-    padding: 20px;
-    zoom: 0.75; /* Scale down to 75% for better viewport fit */
-}
-""")
+        lines.append(CSS_HEADER)
         
+        # Classes with identical declarations share one rule
+        rules: Dict[frozenset, List[str]] = {}
         for class_name, props in sorted(css_dict.items()):
-            if not props:
-                continue
-            
-            lines.append(f".{class_name} {{")
-            
-            prop_order = [
-                'position', 'display', 'flex-direction', 'flex', 'flex-grow',
-                'width', 'height', 'left', 'top', 'right', 'bottom',
-                'align-items', 'align-self', 'justify-content', 'order'
-            ]
-            
-            for prop in prop_order:
-                if prop in props:
-                    lines.append(f"    {prop}: {props[prop]};")
+            if props:
+                rules.setdefault(frozenset(props.items()), []).append(class_name)
+        
+        for class_names in rules.values():
+            props = css_dict[class_names[0]]
             
-            for prop, value in sorted(props.items()):
-                if prop not in prop_order:
-                    lines.append(f"    {prop}: {value};")
+            ordered = sorted(props, key=_prop_sort_key)
             
-            lines.append("}\n")
+            selector = ', '.join(f".{class_name}" for class_name in class_names)
+            body = '\n'.join(f"    {prop}: {props[prop]};" for prop in ordered)
+            lines.append(f"{selector} {{\n{body}\n}}\n")
         
-        lines.append("""
-input {
-    outline: none;
-    font-family: inherit;
-    background: transparent;
-}
-
-input::placeholder {
-    color: #C0C0C0;
-}
-
-input:focus {
-    border-color: #95228C;
-}
-
-button {
-    cursor: pointer;
-    transition: transform 0.2s, opacity 0.2s;
-    border: none;
-    font-family: inherit;
-    font-size: inherit;
-}
-
-button:hover {
-    opacity: 0.9;
-}
-
-button:active {
-    transform: scale(0.98);
-}
-
-a {
-    text-decoration: none;
-}
-
-a:hover {
-    opacity: 0.8;
-}
-
-@media (max-width: 420px) {
-    body {
-        padding: 10px;
-        zoom: 1; /* Reset zoom on mobile */
-    }
-    [class*="frame"], [class*="container"] {
-        width: 100% !important;
-        max-width: 393px;
-        height: auto !important;
-        min-height: 852px;
-    }
-}
-""")
+        lines.append(CSS_FOOTER)
         
         return '\n'.join(lines)
     
@@ -711,9 +895,14 @@ a:hover {
         if not self.fonts:
             self.fonts.add('Inter')
         
+        # One family per case-insensitive name
+        families = {}
+        for font in sorted(self.fonts):
+            families.setdefault(font.lower(), font)
+        
         fonts_param = '&family='.join([
             f"{font.replace(' ', '+')}:wght@100;200;300;400;500;600;700;800;900" 
-            for font in sorted(self.fonts)
+            for font in families.values()
         ])
         
         return f"""<!DOCTYPE html>
@@ -732,95 +921,125 @@ a:hover {
 </body>
 </html>"""
     
-    def convert(self, node_id: str = None, output_file: str = "output.html"):
-        """Convert Figma design to HTML/CSS"""
-        print("🔍 Fetching Figma file...")
-        data = self.fetch_file()
-        print(f"✅ File: {data.get('name', 'Unknown')}")
-        
-        document = data.get('document', {})
-        canvas = document.get('children', [{}])[0]
-        
-        if node_id:
-            def find_node(n, target_id):
-                if n.get('id') == target_id:
-                    return n
-                for child in n.get('children', []):
-                    result = find_node(child, target_id)
-                    if result:
-                        return result
-                return None
-            
-            target_node = find_node(canvas, node_id)
-        else:
-            frames = [c for c in canvas.get('children', []) if c.get('type') == 'FRAME']
-            target_node = frames[0] if frames else None
-        
-        if not target_node:
-            raise ValueError("Target node not found")
-        
-        print(f"🎨 Converting: {target_node.get('name', 'Unnamed')}")
-        
-        html_body, css_dict = self.generate_html(target_node)
-        
-        # Fetch images if any
-        if self.images:
-            print(f"📷 Fetching {len(self.images)} images...")
-            node_ids = list(self.images.keys())
-            image_urls = self.fetch_images(node_ids)
+    def find_node(self, root: Dict, node_id: str) -> Optional[Dict]:
+        """Find a node by id in an already fetched document"""
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.get('id') == node_id:
+                return node
+            stack.extend(node.get('children', ()))
+        return None
+    
+    def convert(self, node_id: str = None, output_file: str = "output.html", data: Optional[Dict] = None):
+        """Convert Figma design to HTML/CSS, reusing a fetch_file() response if given"""
+        try:
+            if node_id and data is None:
+                # Only the requested subtree is downloaded and parsed
+                print(f"🔍 Fetching Figma node {node_id}...")
+                data = self.fetch_node(node_id)
+                print(f"✅ File: {data.get('name', 'Unknown')}")
+                
+                node_data = data.get('nodes', {}).get(node_id) or {}
+                target_node = node_data.get('document')
+            else:
+                if data is None:
+                    print("🔍 Fetching Figma file...")
+                    data = self.fetch_file()
+                print(f"✅ File: {data.get('name', 'Unknown')}")
+                
+                document = data.get('document', {})
+                if node_id:
+                    target_node = self.find_node(document, node_id)
+                else:
+                    canvas = document.get('children', [{}])[0]
+                    target_node = next((c for c in canvas.get('children', ()) if c.get('type') == 'FRAME'), None)
+            
+            if not target_node:
+                raise ValueError("Target node not found")
             
-            # Update CSS with actual image URLs
+            print(f"🎨 Converting: {target_node.get('name', 'Unnamed')}")
+            
+            html_body, css_dict = self.generate_html(target_node)
+            
+            if self.images:
+                print(f"📷 Fetching {len(self.images)} images...")
+            if self.vectors:
+                print(f"🎨 Fetching {len(self.vectors)} SVG vectors...")
+            
+            # Render only the first node per imageRef; all its nodes share that URL
+            render_nodes = {}
             for node_id, image_ref in self.images.items():
-                if node_id in image_urls:
-                    actual_url = image_urls[node_id]
-                    # Find the class name for this node
-                    for class_name, styles in css_dict.items():
-                        if 'background-image' in styles and image_ref in styles['background-image']:
-                            css_dict[class_name]['background-image'] = f"url('{actual_url}')"
-                            print(f"  ✓ {class_name}: {image_ref}.png")
-        
-       # Fetch SVGs for vectors
-        svg_content = {}
-        if self.vectors:
-            print(f"🎨 Fetching {len(self.vectors)} SVG vectors...")
-
-            for node_id, class_name in self.vectors.items():
-                svg_data = self.fetch_svg(node_id)
-                if svg_data:
-                    svg_content[node_id] = svg_data
-                    print(f"  ✓ Downloaded SVG for node {node_id}")
-                else:
-                    print(f"  ✗ Failed to fetch SVG for {node_id}")
+                render_nodes.setdefault(image_ref, node_id)
+            
+            # Figma API calls stay on this thread; SVG downloads overlap them on cdn_session
+            svg_urls = self.fetch_svg_urls(list(self.vectors))
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                svg_future = executor.submit(self.download_svgs, svg_urls)
+                image_urls = self.fetch_images(list(render_nodes.values()))
+            
+            # Fetch images if any
+            if self.images:
+                
+                # Update CSS with actual image URLs, in one pass over the classes
+                image_rules = {
+                    f"url('{image_ref}.png')": (image_ref, f"url('{image_urls[node_id]}')")
+                    for image_ref, node_id in render_nodes.items()
+                    if node_id in image_urls
+                }
+                for class_name, styles in css_dict.items():
+                    image_rule = image_rules.get(styles.get('background-image'))
+                    if image_rule:
+                        image_ref, image_url = image_rule
+                        styles['background-image'] = image_url
+                        print(f"  ✓ {class_name}: {image_ref}.png")
+            
+           # Fetch SVGs for vectors
+            if self.vectors:
+                svg_content = svg_future.result()
+                for node_id in self.vectors:
+                    if node_id in svg_content:
+                        print(f"  ✓ Downloaded SVG for node {node_id}")
+                    else:
+                        print(f"  ✗ Failed to fetch SVG for {node_id}")
 
-            # Replace vector divs with inline SVG
-            if svg_content:
-                print("🧩 Embedding SVGs into HTML...")
+                # Replace vector divs with inline SVG
+                if svg_content:
+                    print("🧩 Embedding SVGs into HTML...")
 
-                for node_id, svg in svg_content.items():
-                    class_name = self.vectors.get(node_id)
-                    if not class_name:
-                        continue
+                    inline_svgs = {}
+                    for node_id, svg in svg_content.items():
+                        class_name = self.vectors.get(node_id)
+                        if not class_name:
+                            continue
 
-                    svg_clean = svg.strip()
-                    svg_clean = re.sub(r'<svg ', f'<svg class="{class_name}" ', svg_clean, count=1)
-                    placeholder = f'<div class="{class_name}" data-node-id="{node_id}"></div>'
-                    html_body = html_body.replace(placeholder, svg_clean)
+                        svg_clean = svg.strip().replace('<svg ', f'<svg class="{class_name}" ', 1)
+                        inline_svgs[(class_name, node_id)] = svg_clean
 
-                    print(f"  ✓ Embedded SVG for {class_name}")
+                        print(f"  ✓ Embedded SVG for {class_name}")
 
-                print("✅ All SVGs embedded successfully.")
+                    # Swap every vector placeholder for its SVG in one pass
+                    html_body = SHAPE_PLACEHOLDER_RE.sub(
+                        lambda match: inline_svgs.get(match.groups(), match.group(0)), html_body)
 
-        
-        css_string = self.css_to_string(css_dict)
-        html_doc = self.generate_html_doc(html_body, css_string)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_doc)
-        
-        print(f"✅ Generated: {output_file}")
-        print(f"📊 Classes: {len(css_dict)}, Fonts: {len(self.fonts)}, Images: {len(self.images)}, Vectors: {len(self.vectors)}")
-        
-        return html_doc
+                    print("✅ All SVGs embedded successfully.")
+
+            
+            css_string = self.css_to_string(css_dict)
+            html_doc = self.generate_html_doc(html_body, css_string)
+            
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(html_doc)
+            
+            print(f"✅ Generated: {output_file}")
+            print(f"📊 Classes: {len(css_dict)}, Fonts: {len(self.fonts)}, Images: {len(self.images)}, Vectors: {len(self.vectors)}")
+            
+            return html_doc
+        finally:
+            # Cache entries hold their nodes, so drop them to release the tree
+            self._visible_fills_cache.clear()
+            self._visible_strokes_cache.clear()
+            self._text_content_cache.clear()
 
 
 def main():
@@ -837,8 +1056,8 @@ def main():
     node_id = sys.argv[3] if len(sys.argv) > 3 else None
     output = sys.argv[4] if len(sys.argv) > 4 else "output.html"
     
-    converter = FigmaToHTMLConverter(token, file_key)
-    converter.convert(node_id, output)
+    with FigmaToHTMLConverter(token, file_key) as converter:
+        converter.convert(node_id, output)
 
 
 if __name__ == "__main__":
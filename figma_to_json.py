@@ -2,6 +2,19 @@ import requests
 import json
 import config
 
+# Optional faster JSON backend
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj, indent=2)
+
 FIGMA_TOKEN = config.FIGMA_TOKEN
 FILE_KEY = config.FILE_KEY
 OUTPUT_FILE = "output.json"
@@ -10,20 +23,23 @@ HEADERS = {
     "X-Figma-Token": FIGMA_TOKEN
 }
 
-def find_frames(node, frames=None):
-    if frames is None:
-        frames = []
-    if node.get("type") == "FRAME":
-        frames.append(node)
-    for child in node.get("children", []):
-        find_frames(child, frames)
+def find_frames(node):
+    # Pre-order walk on an explicit stack, so deep documents cannot hit the
+    # recursion limit; children are pushed in reverse to keep document order
+    frames = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.get("type") == "FRAME":
+            frames.append(node)
+        stack.extend(reversed(node.get("children", ())))
     return frames
 
 def fetch_figma_file(file_key):
     url = f"https://api.figma.com/v1/files/{file_key}"
     response = requests.get(url, headers=HEADERS)
     response.raise_for_status()
-    return response.json()
+    return json_loads(response.content)
 
 def main():
     data = fetch_figma_file(FILE_KEY)
@@ -33,7 +49,7 @@ def main():
     
     # Save frames as JSON to output file
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(frames, f, indent=2)
+        f.write(json_dumps(frames))
     print(f"Frames JSON saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
@@ -5,7 +5,6 @@ Run this to test your setup
 
 import os
 import sys
-from figma_to_html import FigmaToHTMLConverter
 
 
 def test_converter():
@@ -29,54 +28,63 @@ def test_converter():
         print(f"✅ Figma token configured (length: {len(config.FIGMA_TOKEN)})")
         print(f"✅ File key: {config.FILE_KEY}\n")
         
+        # Imported only once the config is known to be usable, so a missing
+        # or unfilled config.py is reported without loading requests first
+        try:
+            from figma_to_html import FigmaToHTMLConverter
+        except ImportError as e:
+            print(f"❌ Could not load the converter: {str(e)}")
+            print("   Install the dependencies with: pip install -r requirements.txt")
+            return False
+        
         # Test API connection
         print("🔌 Testing Figma API connection...")
-        converter = FigmaToHTMLConverter(config.FIGMA_TOKEN, config.FILE_KEY)
-        
-        try:
-            data = converter.fetch_file()
-            print("✅ Successfully connected to Figma API")
-            print(f"✅ File name: {data.get('name', 'Unknown')}")
-            
-            # Get available frames
-            document = data.get('document', {})
-            canvas = document.get('children', [{}])[0]
-            frames = [c for c in canvas.get('children', []) if c.get('type') == 'FRAME']
-            
-            print(f"✅ Found {len(frames)} frame(s) in file\n")
-            
-            if frames:
-                print("📋 Available frames:")
-                for i, frame in enumerate(frames):
-                    frame_id = frame.get('id', 'unknown')
-                    frame_name = frame.get('name', 'Unnamed')
-                    print(f"   {i+1}. {frame_name} (ID: {frame_id})")
+        with FigmaToHTMLConverter(config.FIGMA_TOKEN, config.FILE_KEY) as converter:
+            try:
+                data = converter.fetch_file()
+                print("✅ Successfully connected to Figma API")
+                print(f"✅ File name: {data.get('name', 'Unknown')}")
+                
+                # Get available frames
+                document = data.get('document', {})
+                canvas = document.get('children', [{}])[0]
+                frames = [c for c in canvas.get('children', []) if c.get('type') == 'FRAME']
                 
-                print("\n🎨 Converting first frame...")
-                output_file = "test_output.html"
-                converter.convert(output_file=output_file)
+                print(f"✅ Found {len(frames)} frame(s) in file\n")
                 
-                # Check if file was created
-                if os.path.exists(output_file):
-                    file_size = os.path.getsize(output_file)
+                if frames:
+                    print("📋 Available frames:")
+                    for i, frame in enumerate(frames):
+                        frame_id = frame.get('id', 'unknown')
+                        frame_name = frame.get('name', 'Unnamed')
+                        print(f"   {i+1}. {frame_name} (ID: {frame_id})")
+                    
+                    print("\n🎨 Converting first frame...")
+                    output_file = "test_output.html"
+                    converter.convert(output_file=output_file, data=data)
+                    
+                    # Check if file was created (one stat call for existence and size)
+                    try:
+                        file_size = os.stat(output_file).st_size
+                    except FileNotFoundError:
+                        print("❌ Output file was not created")
+                        return False
+                    
                     print(f"✅ Generated {output_file} ({file_size} bytes)")
                     print(f"\n✨ Test successful! Open {output_file} in your browser.")
                     return True
                 else:
-                    print("❌ Output file was not created")
+                    print("⚠️  No frames found in the Figma file")
                     return False
-            else:
-                print("⚠️  No frames found in the Figma file")
+                    
+            except Exception as e:
+                print(f"❌ API Error: {str(e)}")
+                print("\nPossible issues:")
+                print("  • Invalid Figma token")
+                print("  • Incorrect file key")
+                print("  • File is private and token doesn't have access")
+                print("  • Network connectivity issues")
                 return False
-                
-        except Exception as e:
-            print(f"❌ API Error: {str(e)}")
-            print("\nPossible issues:")
-            print("  • Invalid Figma token")
-            print("  • Incorrect file key")
-            print("  • File is private and token doesn't have access")
-            print("  • Network connectivity issues")
-            return False
             
     except ImportError:
         print("⚠️  No config.py found")